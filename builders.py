@@ -5,43 +5,87 @@ Builds the categorized subject files and the issues investigation report.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 from subjects import DEFAULT_MAX_LINES, LOG_MAX_LINES
 from issue_checks import ISSUE_CHECKS
 from utils import (
+    WORD_TRUNCATION_NOTICE,
     read_file_safe,
+    read_file_lines_safe,
     resolve_paths,
     make_relative,
     heading_anchor,
     count_words,
-    truncate_to_word_limit,
+    tail_within_word_limit,
 )
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 MAX_WORDS_PER_FILE = 499000  # NotebookLM limit (500K) with safety margin
+READ_WORKERS = 8  # Threads for concurrent file reads (I/O-bound)
+
+
+def generation_timestamp() -> str:
+    """Return the "Generated:" timestamp stamped into file headers."""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
 
 # ---------------------------------------------------------------------------
 # Subject markdown builder
 # ---------------------------------------------------------------------------
-def build_subject_md(sos_root: str, subject_def: dict) -> str:
-    """Build the markdown content for one subject, respecting word limits."""
-    # Build header
-    header_lines = [
+def build_subject_md(sos_root: str, subject_def: dict,
+                     timestamp: str | None = None, sos_name: str | None = None) -> tuple[str, str | None]:
+    """Build the markdown content for one subject, respecting word limits.
+
+    Returns (markdown, note), where note describes any word-limit truncation
+    (None otherwise) so callers running builders in parallel decide when to print it.
+    timestamp and sos_name default to now and the sosreport directory name;
+    callers building several files pass them in so they are computed once per run.
+    """
+    parts, note = _subject_parts(sos_root, subject_def, timestamp, sos_name)
+    return "\n".join(parts), note
+
+
+def write_subject_md(out_fp, sos_root: str, subject_def: dict,
+                     timestamp: str | None = None, sos_name: str | None = None) -> str | None:
+    """Write the markdown for one subject to out_fp, returning the truncation note.
+
+    Same output as build_subject_md, without building the full markdown string.
+    """
+    parts, note = _subject_parts(sos_root, subject_def, timestamp, sos_name)
+    _write_parts(out_fp, parts)
+    return note
+
+
+def _write_parts(out_fp, parts: list[str]) -> None:
+    """Write parts to out_fp separated by newlines, as "\n".join(parts) would."""
+    out_fp.write(parts[0])
+    for part in islice(parts, 1, None):
+        out_fp.write("\n")
+        out_fp.write(part)
+
+
+def _subject_parts(sos_root: str, subject_def: dict, timestamp: str | None,
+                   sos_name: str | None) -> tuple[list[str], str | None]:
+    """Build the markdown parts for one subject (joined with newlines) and the truncation note."""
+    timestamp = timestamp or generation_timestamp()
+    sos_name = sos_name or os.path.basename(sos_root)
+
+    # Header, content and footer are accumulated in one list and joined once
+    parts = [
         f"# {subject_def['title']}",
         "",
         f"> {subject_def['description']}",
         "",
-        f"> Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"> SOS Report: `{os.path.basename(sos_root)}`",
+        f"> Generated: {timestamp}",
+        f"> SOS Report: `{sos_name}`",
         "",
         "---",
-        "",
     ]
-    header = "\n".join(header_lines)
 
     file_list = subject_def.get("files", [])
     glob_patterns = subject_def.get("globs", [])
@@ -49,179 +93,305 @@ def build_subject_md(sos_root: str, subject_def: dict) -> str:
     resolved = resolve_paths(sos_root, file_list, glob_patterns)
 
     if not resolved:
-        return header + "*No matching files found in this sosreport.*"
-
-    # Build content sections
-    content_lines = []
-    files_found = 0
-    for filepath in resolved:
-        relpath = make_relative(filepath, sos_root)
-        content = read_file_safe(filepath, max_lines=max_lines)
-        if content is None:
-            continue
-
-        content = content.strip()
-        if not content:
-            continue
-
-        files_found += 1
-        content_lines.append(f"## {relpath}")
-        content_lines.append("")
-        content_lines.append("```")
-        content_lines.append(content)
-        content_lines.append("```")
-        content_lines.append("")
-
-    if files_found == 0:
-        return header + "*No readable files with content found for this subject.*"
+        parts.append("*No matching files found in this sosreport.*")
+        return parts, None
 
-    content = "\n".join(content_lines)
+    header_words = sum(count_words(part) for part in parts)
 
-    # Build footer
-    footer = f"\n---\n*Total files included: {files_found}*"
-
-    # Calculate word budget for content (exclude header and footer)
-    header_words = count_words(header)
-    footer_words = count_words(footer)
+    # Calculate word budget for content (exclude header and footer); the file
+    # count in the footer is a single word whatever its value
+    footer_words = sum(count_words(part) for part in _subject_footer(len(resolved)))
     truncation_notice_words = 20  # Approximate words in truncation notice
     content_word_budget = MAX_WORDS_PER_FILE - header_words - footer_words - truncation_notice_words
 
+    # Build content sections from the last file backwards, counting words as
+    # they are added. Truncation keeps the end of the content, so once the
+    # budget is exceeded the earlier files would be dropped anyway: stop there
+    # and cancel their reads.
+    sections = []
+    section_words = []
+    content_words = 0
+    files_skipped = 0
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        contents = executor.map(lambda path: read_file_safe(path, max_lines=max_lines), reversed(resolved))
+        for i, content in enumerate(contents):
+            if content is None:
+                continue
+
+            content = content.strip()
+            if not content:
+                continue
+
+            relpath = make_relative(resolved[-1 - i], sos_root)
+            section = [f"## {relpath}", "", "```", content, "```", ""]
+            sections.append(section)
+            section_words.append([count_words(part) for part in section])
+            content_words += sum(section_words[-1])
+            if content_words > content_word_budget:
+                files_skipped = sum(1 for path in resolved[:-1 - i] if _has_content(path))
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+
+    if not sections:
+        parts.append("*No readable files with content found for this subject.*")
+        return parts, None
+
+    content_start = len(parts)
+    part_words = []
+    for section, words in zip(reversed(sections), reversed(section_words)):
+        parts.extend(section)
+        part_words.extend(words)
+
     # Truncate content if necessary
-    content_words = count_words(content)
-    was_truncated = False
+    note = None
     if content_words > content_word_budget:
-        content, was_truncated = truncate_to_word_limit(content, content_word_budget)
-        if was_truncated:
-            print(f"      (content truncated from {content_words} to ~{content_word_budget} words)")
-
-    return header + content + footer
+        _truncate_parts(parts, content_start, part_words, content_word_budget)
+        if files_skipped:
+            note = (f"content truncated from over {content_words} to ~{content_word_budget} words, "
+                    f"skipped {files_skipped} earlier file(s)")
+        else:
+            note = f"content truncated from {content_words} to ~{content_word_budget} words"
+
+    parts.extend(_subject_footer(len(sections)))
+    return parts, note
+
+
+def _has_content(path: str) -> bool:
+    """True if path is a non-empty file (missing files and broken symlinks are not)."""
+    try:
+        return os.path.isfile(path) and os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+def _subject_footer(files_found: int) -> list[str]:
+    """Return the footer parts of a subject file."""
+    return ["---", f"*Total files included: {files_found}*"]
+
+
+def _truncate_parts(parts: list[str], start: int, part_words: list[int], max_words: int) -> None:
+    """
+    Truncate parts[start:] in place to max_words, keeping the end (most recent data).
+    part_words holds the word count of each part from start onwards, and their sum
+    must exceed max_words. Trailing parts that fit are kept as-is, the part crossing
+    the budget is cut by whole lines, and earlier parts are dropped, so the content
+    is neither re-joined nor re-counted.
+    """
+    # The header and footer alone can exceed the file budget: keep no content then
+    max_words = max(max_words, 0)
+    first = 0
+    remaining = sum(part_words)
+    while remaining - part_words[first] > max_words:
+        remaining -= part_words[first]
+        first += 1
+
+    rest_words = remaining - part_words[first]
+    kept, kept_words = tail_within_word_limit(parts[start + first], max_words - rest_words)
+    rest = parts[start + first + 1:]
+    notice = WORD_TRUNCATION_NOTICE.format(limit=max_words, n=kept_words + rest_words)
+    if kept:
+        parts[start:] = [notice + kept, *rest]
+    elif rest:
+        parts[start:] = [notice + rest[0], *rest[1:]]
+    else:
+        parts[start:] = [notice]
 
 
 # ---------------------------------------------------------------------------
 # Issues investigation markdown builder
 # ---------------------------------------------------------------------------
-def build_issues_md(sos_root: str) -> str:
-    """Build the issues investigation markdown, respecting word limits."""
-    # Build header
-    header_lines = [
+def _group_checks_by_source(checks: list[dict]) -> dict[str, list[dict]]:
+    """Group check definitions by source file, preserving their order."""
+    grouped = {}
+    for check_def in checks:
+        grouped.setdefault(check_def["source"], []).append(check_def)
+    return grouped
+
+
+# ISSUE_CHECKS grouped by source file, and how many lines to read from each;
+# derived once at import since the check definitions are static
+_CHECKS_BY_SOURCE = _group_checks_by_source(ISSUE_CHECKS)
+_SOURCE_MAX_LINES = {
+    source: max(check_def.get("max_lines", LOG_MAX_LINES) for check_def in check_defs)
+    for source, check_defs in _CHECKS_BY_SOURCE.items()
+}
+
+
+def _run_source_checks(source_path: str, check_defs: list[dict],
+                       max_lines: int) -> dict[str, tuple[bool, str | None]]:
+    """
+    Read one source file and run its checks on that single read.
+    Returns {check name: (triggered, display_content)}, empty if the file is missing.
+    """
+    outcomes = {}
+    all_lines = read_file_lines_safe(source_path, max_lines=max_lines)
+    if all_lines is None:
+        return outcomes
+
+    content = "".join(all_lines)
+    lower = None  # only built if a check on this source needs it
+    for check_def in check_defs:
+        triggered = check_def.get("always_include", False)
+        if not triggered:
+            if lower is None:
+                lower = content.lower()
+            try:
+                triggered = check_def["check"](lower)
+            except Exception:
+                triggered = False
+
+        if not triggered:
+            outcomes[check_def["name"]] = (False, None)
+            continue
+
+        # Determine display content
+        display_content = content
+        if "filter" in check_def:
+            try:
+                filtered = check_def["filter"](all_lines)
+                if filtered:
+                    # Filters may return lines with or without their endings
+                    display_content = "\n".join(line.rstrip("\n") for line in filtered)
+                else:
+                    display_content = None
+            except Exception:
+                display_content = content
+
+        outcomes[check_def["name"]] = (True, display_content)
+
+    return outcomes
+
+
+def build_issues_md(sos_root: str, timestamp: str | None = None,
+                    sos_name: str | None = None) -> tuple[str, str | None]:
+    """Build the issues investigation markdown, respecting word limits.
+
+    Returns (markdown, note) like build_subject_md.
+    """
+    parts, note = _issues_parts(sos_root, timestamp, sos_name)
+    return "\n".join(parts), note
+
+
+def write_issues_md(out_fp, sos_root: str, timestamp: str | None = None,
+                    sos_name: str | None = None) -> str | None:
+    """Write the issues investigation markdown to out_fp, returning the truncation note."""
+    parts, note = _issues_parts(sos_root, timestamp, sos_name)
+    _write_parts(out_fp, parts)
+    return note
+
+
+def _issues_parts(sos_root: str, timestamp: str | None,
+                  sos_name: str | None) -> tuple[list[str], str | None]:
+    """Build the issues investigation markdown parts (joined with newlines) and the truncation note."""
+    timestamp = timestamp or generation_timestamp()
+    sos_name = sos_name or os.path.basename(sos_root)
+
+    # Header, summary, details and footer are accumulated in one list and joined once
+    parts = [
         "# Issues Investigation Report",
         "",
         "> Automated scan of the sosreport for common problems and red flags.",
-        f"> Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"> SOS Report: `{os.path.basename(sos_root)}`",
+        f"> Generated: {timestamp}",
+        f"> SOS Report: `{sos_name}`",
         "",
         "---",
         "",
     ]
 
     # System identity section (part of header)
-    header_lines.append("## System Identity")
-    header_lines.append("")
+    parts.append("## System Identity")
+    parts.append("")
     for quick_file in ["etc/redhat-release", "sos_commands/kernel/uname_-a",
                        "sos_commands/host/hostnamectl", "uptime"]:
         content = read_file_safe(os.path.join(sos_root, quick_file), max_lines=20)
         if content:
-            header_lines.append(f"**{quick_file}:**")
-            header_lines.append(f"```\n{content.strip()}\n```")
-            header_lines.append("")
-    header_lines.append("---")
-    header_lines.append("")
-
-    header = "\n".join(header_lines)
-
-    # --- Run each issue check ---
+            parts.append(f"**{quick_file}:**")
+            parts.append(f"```\n{content.strip()}\n```")
+            parts.append("")
+    parts.append("---")
+
+    # --- Run the issue checks, one task per source file ---
+    # Each task reads its source once and runs all of that source's checks, so
+    # reading one file overlaps with scanning the others
+    outcomes = {}  # check name -> (triggered, display_content)
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        for source_outcomes in executor.map(
+            lambda source: _run_source_checks(os.path.join(sos_root, source),
+                                              _CHECKS_BY_SOURCE[source],
+                                              _SOURCE_MAX_LINES[source]),
+            _CHECKS_BY_SOURCE,
+        ):
+            outcomes.update(source_outcomes)
+
+    # Collate in ISSUE_CHECKS order so the report layout stays stable
     triggered_checks = []  # list of (check_def, display_content)
     clean_checks = []
-
     for check_def in ISSUE_CHECKS:
-        source_path = os.path.join(sos_root, check_def["source"])
-        content = read_file_safe(source_path, max_lines=LOG_MAX_LINES)
-
-        if content is None:
+        if check_def["name"] not in outcomes:
             continue
-
-        triggered = False
-        try:
-            triggered = check_def["check"](content)
-        except Exception:
-            triggered = False
-
-        if not triggered:
+        triggered, display_content = outcomes[check_def["name"]]
+        if triggered:
+            triggered_checks.append((check_def, display_content))
+        else:
             clean_checks.append(check_def["name"])
-            continue
-
-        # Determine display content
-        display_content = content
-        if "filter" in check_def:
-            try:
-                all_lines = content.splitlines()
-                filtered = check_def["filter"](all_lines)
-                if filtered:
-                    display_content = "\n".join(filtered)
-                else:
-                    display_content = None
-            except Exception:
-                display_content = content
-
-        triggered_checks.append((check_def, display_content))
 
     # --- Build summary (placed right after header) ---
-    summary_lines = [
+    parts.extend([
         "## Summary",
         "",
         f"- **Issues flagged:** {len(triggered_checks)}",
         f"- **Checks passed:** {len(clean_checks)}",
         "",
-    ]
+    ])
 
     if triggered_checks:
-        summary_lines.append("### Flagged Issues")
-        summary_lines.append("")
+        parts.append("### Flagged Issues")
+        parts.append("")
         for check_def, _ in triggered_checks:
             anchor = heading_anchor(check_def["name"])
-            summary_lines.append(
+            parts.append(
                 f"- [{check_def['name']}](#{anchor}) — {check_def['description']}"
             )
-        summary_lines.append("")
+        parts.append("")
 
     if clean_checks:
-        summary_lines.append("### Clean Checks (no issues detected)")
-        summary_lines.append("")
+        parts.append("### Clean Checks (no issues detected)")
+        parts.append("")
         for name in clean_checks:
-            summary_lines.append(f"- {name}")
-        summary_lines.append("")
+            parts.append(f"- {name}")
+        parts.append("")
+
+    parts.append("---")
 
-    summary_lines.append("---")
-    summary_lines.append("")
-    summary = "\n".join(summary_lines)
+    preamble_words = sum(count_words(part) for part in parts)
 
     # --- Build detail sections for each triggered issue ---
-    detail_lines = []
-    for check_def, display_content in triggered_checks:
-        detail_lines.append(f"## {check_def['name']}")
-        detail_lines.append("")
-        detail_lines.append(f"**Source:** `{check_def['source']}`")
-        detail_lines.append(f"**What this means:** {check_def['description']}")
-        detail_lines.append("")
+    content_start = len(parts)
+    for i, (check_def, display_content) in enumerate(triggered_checks):
+        if i:
+            parts.append("")
+        parts.append(f"## {check_def['name']}")
+        parts.append("")
+        parts.append(f"**Source:** `{check_def['source']}`")
+        parts.append(f"**What this means:** {check_def['description']}")
+        parts.append("")
 
         if display_content is None:
             terms = check_def.get("filter_terms", "the specified patterns")
-            detail_lines.append(
+            parts.append(
                 f"*Searched `{check_def['source']}` for {terms} "
                 f"— no matching lines found.*"
             )
         else:
-            detail_lines.append("```")
-            detail_lines.append(display_content.strip())
-            detail_lines.append("```")
-        detail_lines.append("")
-        detail_lines.append("---")
-        detail_lines.append("")
-
-    main_content = "\n".join(detail_lines)
+            parts.append("```")
+            parts.append(display_content.strip())
+            parts.append("```")
+        parts.append("")
+        parts.append("---")
+    part_words = [count_words(part) for part in parts[content_start:]]
 
     # --- Build footer (next steps) ---
-    footer_lines = [
+    footer = [
         "## Recommended Next Steps",
         "",
         "Use this file together with the subject-specific files to investigate "
@@ -236,21 +406,19 @@ def build_issues_md(sos_root: str) -> str:
         '- "Compare this system config against RHEL best practices"',
         "",
     ]
-    footer = "\n".join(footer_lines)
 
     # Calculate word budget for detail content (exclude header, summary, footer)
-    header_words = count_words(header)
-    summary_words = count_words(summary)
-    footer_words = count_words(footer)
+    footer_words = sum(count_words(part) for part in footer)
     truncation_notice_words = 20
-    content_word_budget = (MAX_WORDS_PER_FILE - header_words - summary_words
+    content_word_budget = (MAX_WORDS_PER_FILE - preamble_words
                            - footer_words - truncation_notice_words)
 
     # Truncate detail content if necessary
-    content_words = count_words(main_content)
+    note = None
+    content_words = sum(part_words)
     if content_words > content_word_budget:
-        main_content, was_truncated = truncate_to_word_limit(main_content, content_word_budget)
-        if was_truncated:
-            print(f"      (content truncated from {content_words} to ~{content_word_budget} words)")
+        _truncate_parts(parts, content_start, part_words, content_word_budget)
+        note = f"content truncated from {content_words} to ~{content_word_budget} words"
 
-    return header + summary + main_content + footer
+    parts.extend(footer)
+    return parts, note
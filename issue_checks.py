@@ -8,125 +8,209 @@ Structure:
     {
         "name": "Display name for the issue",
         "source": "path/to/file/in/sosreport",
-        "check": lambda content: <bool expression>,  # Returns True if issue detected
-        "filter": lambda lines: <filtered lines>,    # Optional: extract relevant lines
-        "filter_terms": "human-readable search terms", # Optional: describes what filter looks for
+        "check": lambda lower: <bool expression>,      # Returns truthy if issue detected
+        "filter": lambda lines: <filtered lines>,      # Optional: extract relevant lines
+        "filter_terms": "human-readable search terms",  # Optional: describes what filter looks for
+        "always_include": True,                         # Optional: include without a check
+        "max_lines": 1500,                              # Optional: lines read from source (default: 40000)
         "description": "What this issue means",
     }
+
+Entries marked always_include replace a check that is always true: the
+source is included for review without being lowercased or checked. Most
+of them set a smaller max_lines since no scan needs the full log; keep
+the default where the whole file matters (e.g. per-interface counters).
+
+Checks that share a source file are run against a single read of it:
+`lower` is the lowercased file text, computed once per source. Keyword
+checks are plain substring tests (see _contains_any); a compiled
+pattern's bound `search` method works where a regex is needed. Filters
+receive the file's lines as read, with their line endings, and may
+return lines with or without them. All regex patterns are compiled
+once at import; filter patterns are case-insensitive so no per-line
+lowercase copies are made.
 """
 
 import re
+from collections.abc import Iterable
+from itertools import islice
+
+from subjects import DEFAULT_MAX_LINES
+
+
+def _any_of(*keywords: str, flags: int = 0) -> re.Pattern:
+    """Compile keywords into one alternation pattern, so a single scan finds any of them."""
+    return re.compile("|".join(map(re.escape, keywords)), flags)
+
+
+def _first_matching(lines: Iterable[str], pattern: re.Pattern, n: int) -> list[str]:
+    """Return the first n lines matching pattern, stopping at the nth hit."""
+    return list(islice(filter(pattern.search, lines), n))
+
+
+def _last_matching(lines: list[str], pattern: re.Pattern, n: int) -> list[str]:
+    """Return the last n lines matching pattern, scanning backwards and stopping at the nth hit."""
+    matches = _first_matching(reversed(lines), pattern, n)
+    matches.reverse()
+    return matches
+
+
+def _contains_any(*keywords: str):
+    """Return a check that is true if the lowercased content contains any keyword.
+
+    Plain substring tests run as fast literal searches, several times quicker
+    than a regex alternation on clean logs, where every byte must be scanned.
+    """
+    return lambda lower: any(keyword in lower for keyword in keywords)
+
+
+# Checks: literal keyword tests against the lowercased content of the source
+_AVC_CHECK = _contains_any("denied", "avc:")
+_OOM_CHECK = _contains_any("out of memory", "oom-killer")
+_DMESG_CHECK = _contains_any("error", "panic", "oops", "bug:", "call trace")
+_FS_CHECK = _contains_any("ext4-fs error", "xfs error", "i/o error", "buffer i/o error", "filesystem error", "remount,ro")
+_MULTIPATH_CHECK = _contains_any("faulty", "failed", "shaky", "ghost")
+_SEGFAULT_CHECK = _contains_any("segfault", "core dump", "trapping")
+_SUBSCRIPTION_CHECK = _contains_any("invalid", "not registered", "warning")
+_AUTH_CHECK = _contains_any("failed", "invalid user")
+_ZOMBIE_CHECK_RE = _any_of("defunct", "<zombie>")
+
+# Filter patterns: case-insensitive, matched against raw lines without lowering them
+_AVC_FILTER_RE = _any_of("denied", "avc:", flags=re.I)
+_OOM_FILTER_RE = _any_of("oom", flags=re.I)
+_DMESG_FILTER_RE = _any_of("error", "panic", "oops", "bug:", "call trace", "warning", flags=re.I)
+_FS_FILTER_RE = _any_of("ext4", "xfs error", "i/o error", "buffer i/o", "filesystem error", "readonly", flags=re.I)
+_SEGFAULT_FILTER_RE = _any_of("segfault", "core dump", "trapping", flags=re.I)
+_ZOMBIE_FILTER_RE = _any_of("defunct", "zombie", flags=re.I)
+_AUTH_FILTER_RE = _any_of("failed", "invalid user", flags=re.I)
+
+# Disk usage of 90-100%, e.g. in the "Use%" column of df
+_HIGH_PCT_RE = re.compile(r"\b(9\d|100)%")
+
+
+def _too_many_zombies(lower: str, limit: int = 5) -> bool:
+    """True once either "defunct" or "<zombie>" occurs more than limit times, in one scan."""
+    counts = {"defunct": 0, "<zombie>": 0}
+    for match in _ZOMBIE_CHECK_RE.finditer(lower):
+        counts[match.group()] += 1
+        if counts[match.group()] > limit:
+            return True
+    return False
+
 
 ISSUE_CHECKS = [
     {
         "name": "Failed Systemd Units",
         "source": "sos_commands/systemd/systemctl_list-units_--failed",
-        "check": lambda content: content.strip() and "0 loaded units listed" not in content,
+        "check": lambda lower: lower.strip() and "0 loaded units listed" not in lower,
         "description": "Services that have failed and may need attention.",
     },
     {
         "name": "SELinux Denials in Audit Log",
         "source": "var/log/audit/audit.log",
-        "check": lambda content: "denied" in content.lower() or "avc:" in content.lower(),
-        "filter": lambda lines: [l for l in lines if "denied" in l.lower() or "avc:" in l.lower()][-200:],
+        "check": _AVC_CHECK,
+        "filter": lambda lines: _last_matching(lines, _AVC_FILTER_RE, 200),
         "filter_terms": "lines containing 'denied' or 'avc:'",
         "description": "SELinux AVC denials that may indicate policy issues.",
     },
     {
         "name": "OOM Killer Events",
         "source": "var/log/messages",
-        "check": lambda content: "out of memory" in content.lower() or "oom-killer" in content.lower(),
-        "filter": lambda lines: [l for l in lines if "oom" in l.lower()][-100:],
+        "check": _OOM_CHECK,
+        "filter": lambda lines: _last_matching(lines, _OOM_FILTER_RE, 100),
         "filter_terms": "lines containing 'oom'",
         "description": "Out-of-memory killer invocations — system ran out of RAM.",
     },
     {
         "name": "Kernel Errors / Panics / Oops in dmesg",
         "source": "sos_commands/kernel/dmesg",
-        "check": lambda content: any(kw in content.lower() for kw in ["error", "panic", "oops", "bug:", "call trace"]),
-        "filter": lambda lines: [l for l in lines if any(kw in l.lower() for kw in ["error", "panic", "oops", "bug:", "call trace", "warning"])][-200:],
+        "check": _DMESG_CHECK,
+        "filter": lambda lines: _last_matching(lines, _DMESG_FILTER_RE, 200),
         "filter_terms": "lines containing 'error', 'panic', 'oops', 'bug:', 'call trace', or 'warning'",
         "description": "Kernel-level errors, panics, or warnings from dmesg.",
     },
     {
         "name": "Filesystem Errors in Logs",
         "source": "var/log/messages",
-        "check": lambda content: any(kw in content.lower() for kw in ["ext4-fs error", "xfs error", "i/o error", "buffer i/o error", "filesystem error", "remount,ro"]),
-        "filter": lambda lines: [l for l in lines if any(kw in l.lower() for kw in ["ext4", "xfs error", "i/o error", "buffer i/o", "filesystem error", "readonly"])][-100:],
+        "check": _FS_CHECK,
+        "filter": lambda lines: _last_matching(lines, _FS_FILTER_RE, 100),
         "filter_terms": "lines containing 'ext4', 'xfs error', 'i/o error', 'buffer i/o', 'filesystem error', or 'readonly'",
         "description": "Filesystem errors that could indicate disk problems.",
     },
     {
         "name": "Disk Space Issues",
         "source": "sos_commands/filesys/df_-al",
-        "check": lambda content: any(int(m) >= 90 for m in re.findall(r'(\d+)%', content) if m.isdigit()),
-        "filter": lambda lines: [lines[0]] + [l for l in lines[1:] if re.search(r'(9\d|100)%', l)],
+        "check": _HIGH_PCT_RE.search,
+        "filter": lambda lines: [lines[0]] + [l for l in lines[1:] if _HIGH_PCT_RE.search(l)],
         "filter_terms": "lines showing 90–100% disk usage",
         "description": "Filesystems at or above 90% usage.",
     },
     {
         "name": "Network Errors / Drops",
         "source": "sos_commands/networking/ip_-s_link",
-        "check": lambda content: True,  # always include for review
+        "always_include": True,  # always include for review (full read: one block per interface)
         "description": "Network interface statistics — check for RX/TX errors and drops.",
     },
     {
         "name": "Multipath Issues",
         "source": "sos_commands/multipath/multipath_-ll",
-        "check": lambda content: any(kw in content.lower() for kw in ["faulty", "failed", "shaky", "ghost"]),
+        "check": _MULTIPATH_CHECK,
         "description": "Multipath paths that are not in active/ready state.",
     },
     {
         "name": "Core Dumps / Segfaults in Logs",
         "source": "var/log/messages",
-        "check": lambda content: any(kw in content.lower() for kw in ["segfault", "core dump", "trapping"]),
-        "filter": lambda lines: [l for l in lines if any(kw in l.lower() for kw in ["segfault", "core dump", "trapping"])][-100:],
+        "check": _SEGFAULT_CHECK,
+        "filter": lambda lines: _last_matching(lines, _SEGFAULT_FILTER_RE, 100),
         "filter_terms": "lines containing 'segfault', 'core dump', or 'trapping'",
         "description": "Application crashes recorded in system logs.",
     },
     {
         "name": "Subscription / Entitlement Warnings",
         "source": "sos_commands/subscription_manager/subscription-manager_status",
-        "check": lambda content: "invalid" in content.lower() or "not registered" in content.lower() or "warning" in content.lower(),
+        "check": _SUBSCRIPTION_CHECK,
         "description": "Subscription manager reporting issues with entitlements.",
     },
     {
         "name": "NTP / Time Sync Issues",
         "source": "sos_commands/date/timedatectl",
-        "check": lambda content: "no" in content.lower() and "synchronized" in content.lower(),
+        "check": lambda lower: "no" in lower and "synchronized" in lower,
         "description": "System clock is not synchronized — could cause auth and log issues.",
     },
     {
         "name": "Kdump / Crash Configuration",
         "source": "etc/kdump.conf",
-        "check": lambda content: True,  # always include for reference
+        "always_include": True,  # always include for reference
+        "max_lines": DEFAULT_MAX_LINES,
         "description": "Kdump configuration — verify crash dump settings.",
     },
     {
         "name": "High Zombie / Defunct Processes",
         "source": "sos_commands/process/ps_auxwww",
-        "check": lambda content: content.lower().count("defunct") > 5 or content.lower().count("<zombie>") > 5,
-        "filter": lambda lines: [l for l in lines if "defunct" in l.lower() or "zombie" in l.lower()][:100],
+        "check": _too_many_zombies,
+        "filter": lambda lines: _first_matching(lines, _ZOMBIE_FILTER_RE, 100),
         "filter_terms": "lines containing 'defunct' or 'zombie'",
         "description": "Large number of zombie/defunct processes detected.",
     },
     {
         "name": "Hardware Errors (MCE)",
         "source": "sos_commands/hardware/dmidecode",
-        "check": lambda content: True,  # always include summary
+        "always_include": True,  # always include summary
+        "max_lines": DEFAULT_MAX_LINES,
         "description": "DMI/BIOS data — review for hardware alerts.",
     },
     {
         "name": "Swap Usage",
         "source": "sos_commands/memory/free_-m",
-        "check": lambda content: True,  # always include
+        "always_include": True,  # always include
+        "max_lines": DEFAULT_MAX_LINES,
         "description": "Memory and swap usage — high swap may indicate memory pressure.",
     },
     {
         "name": "Authentication Failures",
         "source": "var/log/secure",
-        "check": lambda content: "failed" in content.lower() or "invalid user" in content.lower(),
-        "filter": lambda lines: [l for l in lines if "failed" in l.lower() or "invalid user" in l.lower()][-200:],
+        "check": _AUTH_CHECK,
+        "filter": lambda lines: _last_matching(lines, _AUTH_FILTER_RE, 200),
         "filter_terms": "lines containing 'failed' or 'invalid user'",
         "description": "Failed authentication attempts — potential security concern.",
     },
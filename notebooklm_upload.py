@@ -23,19 +23,46 @@ from pathlib import Path
 from reference_urls import get_reference_urls
 from skill_template import STATIC_SKILL
 
+UPLOAD_CONCURRENCY = 5  # Max source uploads in flight at once
 
-def build_notebook_instructions(system_meta: dict) -> str:
-    dynamic_header = f"""\
+
+async def _gather_bounded(coros, limit: int = UPLOAD_CONCURRENCY) -> list:
+    """Await coroutines concurrently, at most `limit` at a time.
+
+    Returns results in input order; a failed call yields its exception.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(_bounded(c) for c in coros), return_exceptions=True)
+
+
+# Header prepended to STATIC_SKILL; placeholders are filled from system_meta
+_INSTRUCTIONS_HEADER = """\
 ## System Under Analysis
 
-- **Host:**          {system_meta.get('hostname', 'See 01_system_overview.md')}
-- **RHEL Version:**  {system_meta.get('rhel_version', 'See 01_system_overview.md')}
-- **Architecture:**  {system_meta.get('arch', 'See 01_system_overview.md')}
-- **Analysis Date:** {system_meta.get('date', date.today().isoformat())}
-- **SOS Report:**    {system_meta.get('sos_report_name', 'See 01_system_overview.md')}
+- **Host:**          {hostname}
+- **RHEL Version:**  {rhel_version}
+- **Architecture:**  {arch}
+- **Analysis Date:** {date}
+- **SOS Report:**    {sos_report_name}
 
 """
-    return dynamic_header + STATIC_SKILL
+
+_INSTRUCTIONS_DEFAULTS = {
+    "hostname": "See 01_system_overview.md",
+    "rhel_version": "See 01_system_overview.md",
+    "arch": "See 01_system_overview.md",
+    "sos_report_name": "See 01_system_overview.md",
+}
+
+
+def build_notebook_instructions(system_meta: dict) -> str:
+    fields = _INSTRUCTIONS_DEFAULTS | {"date": date.today().isoformat()} | system_meta
+    return _INSTRUCTIONS_HEADER.format_map(fields) + STATIC_SKILL
 
 
 async def upload_to_notebooklm(
@@ -104,15 +131,17 @@ async def upload_to_notebooklm(
         print(f"  Added instructions note")
         print()
 
-        # Upload each file (including 00_notebook_instructions.md)
+        # Upload each file (including 00_notebook_instructions.md) concurrently
         uploaded = 0
-        for md_file in md_files:
-            try:
-                await client.sources.add_file(notebook_id, md_file)
+        results = await _gather_bounded(
+            client.sources.add_file(notebook_id, md_file) for md_file in md_files
+        )
+        for md_file, result in zip(md_files, results):
+            if isinstance(result, BaseException):
+                print(f"  FAILED:   {md_file.name} — {result}")
+            else:
                 print(f"  Uploaded: {md_file.name}")
                 uploaded += 1
-            except Exception as e:
-                print(f"  FAILED:   {md_file.name} — {e}")
 
         # Upload reference URLs
         ref_urls = get_reference_urls(rhel_version)
@@ -120,15 +149,17 @@ async def upload_to_notebooklm(
             print()
             version_label = f"RHEL {rhel_version}" if rhel_version else "default"
             print(f"  Adding {len(ref_urls)} reference URLs ({version_label})...")
-            for url in ref_urls:
-                try:
-                    await client.sources.add_url(notebook_id, url)
+            results = await _gather_bounded(
+                client.sources.add_url(notebook_id, url) for url in ref_urls
+            )
+            for url, result in zip(ref_urls, results):
+                if isinstance(result, BaseException):
+                    print(f"  FAILED:   {url} — {result}")
+                else:
                     # Show just the doc name, not the full URL
                     short = url.rsplit("/", 2)[-2] if "/html-single/" in url else url.split("/")[-1]
                     print(f"  Uploaded: {short}")
                     uploaded += 1
-                except Exception as e:
-                    print(f"  FAILED:   {url} — {e}")
 
         # Summary
         print()
@@ -148,7 +179,32 @@ async def upload_to_notebooklm(
     return notebook_id
 
 
-def main():
+def run_upload(output_dir: str, notebook_name: str, rhel_version: int | None = None) -> None:
+    """Run upload_to_notebooklm, printing the error and exiting with status 1 on failure.
+
+    Shared by this module's main() and preproc-sos.py's -n option.
+    """
+    try:
+        asyncio.run(upload_to_notebooklm(output_dir, notebook_name, rhel_version))
+    except ImportError:
+        print("ERROR: notebooklm-py is required for NotebookLM upload.")
+        print()
+        print("Set up a virtual environment and install:")
+        print("  python3 -m venv .venv")
+        print("  source .venv/bin/activate")
+        print('  pip install "notebooklm-py[browser]"')
+        print("  playwright install chromium")
+        print("  notebooklm login")
+        sys.exit(1)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"ERROR: NotebookLM upload failed: {e}")
+        sys.exit(1)
+
+
+def main(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(
         description="Upload markdown files to a NotebookLM notebook"
     )
@@ -168,7 +224,7 @@ def main():
         help="RHEL major version (e.g., 8 or 9) for reference URLs. "
              "Defaults to 9 if not specified.",
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     output_dir = os.path.abspath(args.output_dir)
     notebook_name = args.name or os.path.basename(output_dir)
@@ -177,24 +233,7 @@ def main():
         print(f"ERROR: Directory not found: {output_dir}")
         sys.exit(1)
 
-    try:
-        asyncio.run(upload_to_notebooklm(output_dir, notebook_name, args.rhel_version))
-    except ImportError:
-        print("ERROR: notebooklm-py is required for NotebookLM upload.")
-        print()
-        print("Set up a virtual environment and install:")
-        print("  python3 -m venv .venv")
-        print("  source .venv/bin/activate")
-        print('  pip install "notebooklm-py[browser]"')
-        print("  playwright install chromium")
-        print("  notebooklm login")
-        sys.exit(1)
-    except FileNotFoundError as e:
-        print(f"ERROR: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"ERROR: NotebookLM upload failed: {e}")
-        sys.exit(1)
+    run_upload(output_dir, notebook_name, args.rhel_version)
 
 
 if __name__ == "__main__":
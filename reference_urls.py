@@ -50,13 +50,18 @@ VERSION_URLS = {
 }
 
 
-def get_reference_urls(rhel_major_version: int | None) -> list[str]:
-    """Return the list of reference URLs for the given RHEL major version.
+# Common URLs merged with each version's list, built once at import
+_MERGED_URLS = {
+    version: (*COMMON_URLS, *urls)
+    for version, urls in VERSION_URLS.items()
+}
+
+
+def get_reference_urls(rhel_major_version: int | None) -> tuple[str, ...]:
+    """Return the reference URLs for the given RHEL major version.
 
     Includes common URLs plus version-specific URLs.
     Falls back to RHEL 9 if the version is unknown.
+    The merged tuples are shared, so the result is immutable.
     """
-    urls = list(COMMON_URLS)
-    version = rhel_major_version or 9
-    urls.extend(VERSION_URLS.get(version, VERSION_URLS[9]))
-    return urls
+    return _MERGED_URLS.get(rhel_major_version or 9, _MERGED_URLS[9])
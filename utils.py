@@ -5,22 +5,54 @@ Generic helpers for file I/O, path resolution, text truncation,
 directory validation, and user interaction.
 """
 
+import fnmatch
+import io
 import os
 import glob
 import re
+import sys
+from collections import deque
+from functools import lru_cache
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 TRUNCATION_NOTICE = "\n... [TRUNCATED — showing last {n} lines] ...\n"
 WORD_TRUNCATION_NOTICE = "\n\n... [TRUNCATED — exceeded {limit} word limit, showing last {n} words] ...\n\n"
+WRITE_BUFFER_SIZE = 1024 * 1024  # Output buffer, so many small parts become few writes
+TAIL_CHUNK_SIZE = 64 * 1024  # Initial tail window, doubled until it holds enough lines
 
 
 # ---------------------------------------------------------------------------
 # User interaction
 # ---------------------------------------------------------------------------
+# Whether stdin is a terminal; checked once, since it cannot change during a run
+_STDIN_IS_TTY = sys.stdin is not None and sys.stdin.isatty()
+_ENV_TRUE_VALUES = ("1", "y", "yes", "true")
+
+
+def _env_flag(name: str) -> bool:
+    """True if environment variable name is set to an explicit yes value (1, y, yes, true)."""
+    return os.environ.get(name, "").strip().lower() in _ENV_TRUE_VALUES
+
+
 def confirm_prompt(message: str) -> bool:
-    """Ask user for yes/no confirmation."""
+    """
+    Ask user for yes/no confirmation.
+    SOS_AUTO_NO / SOS_AUTO_YES (set to 1, y, yes or true) answer without
+    asking, NO taking precedence; when stdin is not a terminal (CI,
+    pipelines) and neither is set, the answer is no.
+    """
+    if _env_flag("SOS_AUTO_NO"):
+        print(f"{message} [y/N]: n (SOS_AUTO_NO)")
+        return False
+    if _env_flag("SOS_AUTO_YES"):
+        print(f"{message} [y/N]: y (SOS_AUTO_YES)")
+        return True
+    if not _STDIN_IS_TTY:
+        print(f"{message} [y/N]: n (non-interactive)")
+        return False
+
     while True:
         response = input(f"{message} [y/N]: ").strip().lower()
         if response in ("y", "yes"):
@@ -33,44 +65,120 @@ def confirm_prompt(message: str) -> bool:
 # ---------------------------------------------------------------------------
 # Directory validation
 # ---------------------------------------------------------------------------
+# Common directories and files found in sosreport, in reporting order
+_SOS_INDICATORS = (
+    "sos_commands",
+    "etc",
+    "proc",
+    "var",
+    "sos_logs",
+    "sos_reports",
+    "installed-rpms",
+    "uname",
+    "hostname",
+    "uptime",
+    "date",
+    "free",
+    "version.txt",
+)
+
+
 def is_valid_sos_directory(path: str) -> tuple[bool, list[str]]:
     """
     Check if the given path looks like a valid sosreport directory.
     Returns (is_valid, list_of_found_indicators).
     """
-    # Common directories and files found in sosreport
-    sos_indicators = [
-        "sos_commands",
-        "etc",
-        "proc",
-        "var",
-        "sos_logs",
-        "sos_reports",
-        "installed-rpms",
-        "uname",
-        "hostname",
-        "uptime",
-        "date",
-        "free",
-        "version.txt",
-    ]
-
-    found = []
-    for indicator in sos_indicators:
-        full_path = os.path.join(path, indicator)
-        if os.path.exists(full_path):
-            found.append(indicator)
+    # One directory listing instead of an exists() call per indicator; it goes
+    # through the shared scandir cache, so path resolution reuses it later
+    _refresh_dir_cache(path)
+    entries = _scandir_cached(path)
+    found = [indicator for indicator in _SOS_INDICATORS if indicator in entries]
 
     # Consider valid if we find at least sos_commands + 2 others, or 4+ indicators
-    has_sos_commands = "sos_commands" in found
+    has_sos_commands = "sos_commands" in entries
     is_valid = (has_sos_commands and len(found) >= 3) or len(found) >= 4
 
     return is_valid, found
 
 
+def validate_args(sosreport_dir: str, output_dir: str) -> tuple[str, str]:
+    """
+    Validate the sosreport and output directories given on the command line.
+    Creates the output directory if needed and asks before reusing a non-empty
+    one; prints the problem and exits on invalid input.
+    Returns the absolute (sos_root, output_dir).
+    """
+    sos_root = os.path.abspath(sosreport_dir)
+    output_dir = os.path.abspath(output_dir)
+
+    # --- Validate SOS directory exists ---
+    if not os.path.isdir(sos_root):
+        print(f"ERROR: sosreport directory not found: {sos_root}")
+        sys.exit(1)
+
+    # --- Validate SOS directory looks like a valid sosreport ---
+    is_valid, found_indicators = is_valid_sos_directory(sos_root)
+    if not is_valid:
+        print(f"ERROR: Directory does not appear to be a valid sosreport: {sos_root}")
+        print()
+        if found_indicators:
+            print(f"  Found only: {', '.join(found_indicators)}")
+        else:
+            print("  No sosreport indicators found (sos_commands, etc, proc, var, installed-rpms, ...)")
+        print()
+        print("A valid sosreport directory should contain 'sos_commands/' and other")
+        print("diagnostic directories like 'etc/', 'proc/', 'var/', etc.")
+        sys.exit(1)
+
+    # --- Handle output directory ---
+    if not os.path.exists(output_dir):
+        # Output directory doesn't exist - create it
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Created output directory: {output_dir}")
+        print()
+    elif os.path.isdir(output_dir):
+        # Output directory exists - check if it's the same as SOS directory
+        if os.path.samefile(sos_root, output_dir):
+            print(f"ERROR: Output directory cannot be the same as the sosreport directory!")
+            print(f"  SOS directory: {sos_root}")
+            print(f"  Output directory: {output_dir}")
+            print()
+            print("Please specify a different output directory.")
+            sys.exit(1)
+
+        # Check if output directory is not empty
+        existing_items = os.listdir(output_dir)
+        if existing_items:
+            print(f"Output directory is not empty: {output_dir}")
+            print()
+            # Show up to 10 items
+            display_items = existing_items[:10]
+            print("  Existing items:")
+            for item in display_items:
+                item_path = os.path.join(output_dir, item)
+                item_type = "dir" if os.path.isdir(item_path) else "file"
+                print(f"    - {item} ({item_type})")
+            if len(existing_items) > 10:
+                print(f"    ... and {len(existing_items) - 10} more items")
+            print()
+            if not confirm_prompt("Continue? (some existing files may be overwritten)"):
+                print("Aborted.")
+                sys.exit(0)
+            print()
+    else:
+        print(f"ERROR: Output path exists but is not a directory: {output_dir}")
+        sys.exit(1)
+
+    return sos_root, output_dir
+
+
 # ---------------------------------------------------------------------------
 # SOS metadata
 # ---------------------------------------------------------------------------
+# e.g. "Red Hat Enterprise Linux release 9.3 (Plow)"
+_RELEASE_RE = re.compile(r"release\s+(\d+)")
+
+
 def detect_rhel_version(sos_root: str) -> int | None:
     """Detect the RHEL major version from etc/redhat-release in the sosreport.
 
@@ -80,10 +188,10 @@ def detect_rhel_version(sos_root: str) -> int | None:
     if not os.path.isfile(release_file):
         return None
     try:
+        # The release string is the file's first line
         with open(release_file, "r") as f:
-            content = f.read().strip()
-        # e.g. "Red Hat Enterprise Linux release 9.3 (Plow)"
-        match = re.search(r"release\s+(\d+)", content)
+            first_line = f.readline()
+        match = _RELEASE_RE.search(first_line)
         if match:
             return int(match.group(1))
     except Exception:
@@ -94,42 +202,206 @@ def detect_rhel_version(sos_root: str) -> int | None:
 # ---------------------------------------------------------------------------
 # File I/O
 # ---------------------------------------------------------------------------
+def read_file_lines_safe(filepath: str, max_lines: int = 1500) -> list[str] | None:
+    """
+    Read a file line by line, keeping only the last max_lines lines.
+    Lines keep their line endings, so "".join() of the result equals
+    read_file_safe() (including the truncation notice or error message).
+    """
+    if not os.path.isfile(filepath):
+        return None
+    try:
+        text, truncated = _last_lines(_read_tail_text(filepath, max_lines + 1), max_lines)
+    except Exception as e:
+        return [f"[ERROR reading file: {e}]"]
+    lines = io.StringIO(text, newline="\n").readlines()
+    if truncated:
+        return [TRUNCATION_NOTICE.format(n=max_lines), *lines]
+    return lines
+
+
 def read_file_safe(filepath: str, max_lines: int = 1500) -> str | None:
     """Read a file, return content truncated to max_lines (from the tail)."""
     if not os.path.isfile(filepath):
         return None
     try:
-        with open(filepath, "r", errors="replace") as f:
-            lines = f.readlines()
-        if len(lines) > max_lines:
-            notice = TRUNCATION_NOTICE.format(n=max_lines)
-            return notice + "".join(lines[-max_lines:])
-        return "".join(lines)
+        text, truncated = _last_lines(_read_tail_text(filepath, max_lines + 1), max_lines)
     except Exception as e:
         return f"[ERROR reading file: {e}]"
+    if truncated:
+        return TRUNCATION_NOTICE.format(n=max_lines) + text
+    return text
+
+
+def _read_tail_text(filepath: str, n: int) -> str:
+    """
+    Return whole lines from the end of a file: at least its last n lines, or
+    all of it if it is shorter. Blocks are read backwards from the end until
+    they hold more than n line endings, then decoded once. Decoding and
+    newline translation match open(filepath, "r", errors="replace").
+    """
+    with open(filepath, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        chunk_size = TAIL_CHUNK_SIZE
+        chunks = deque()
+        endings = 0
+        while True:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunk_size *= 2
+            # "\r", "\n" and "\r\n" all end a line, as in text mode; count
+            # only the new block, fixing up a "\r\n" split across blocks
+            endings += chunk.count(b"\n") + chunk.count(b"\r") - chunk.count(b"\r\n")
+            if chunks and chunk.endswith(b"\r") and chunks[0].startswith(b"\n"):
+                endings -= 1
+            chunks.appendleft(chunk)
+            if not pos or endings > n:
+                break
+
+    text = io.TextIOWrapper(io.BytesIO(b"".join(chunks)), errors="replace").read()
+    if pos:
+        # The window may start mid-line (or mid-character): drop that line
+        text = text[text.find("\n") + 1:]
+    return text
+
+
+def _last_lines(text: str, max_lines: int) -> tuple[str, bool]:
+    """Return the last max_lines "\n"-terminated lines of text, and whether any were cut."""
+    start = len(text) - 1 if text.endswith("\n") else len(text)
+    for _ in range(max_lines):
+        start = text.rfind("\n", 0, start)
+        if start < 0:
+            return text, False
+    return text[start + 1:], True
+
+
+# Directory listings, keyed by path and filled lazily by _scandir_cached. The
+# sosreport is not modified while it is processed, so a listing (and the file
+# type cached on each DirEntry) is reused by every subject that touches it;
+# _refresh_dir_cache drops a root's listings if the root itself changes.
+_dir_cache: dict[str, dict[str, os.DirEntry]] = {}
+_root_mtimes: dict[str, int | None] = {}  # sosreport root -> mtime its listings were taken at
+
+
+def _scandir_cached(path: str) -> dict[str, os.DirEntry]:
+    """Return the entries of directory path by name, scanning it only once."""
+    entries = _dir_cache.get(path)
+    if entries is None:
+        try:
+            with os.scandir(path) as it:
+                entries = {entry.name: entry for entry in it}
+        except OSError:
+            entries = {}
+        _dir_cache[path] = entries
+    return entries
+
+
+def _refresh_dir_cache(root: str) -> None:
+    """
+    Drop the cached listings under root if root's mtime changed since they
+    were taken, e.g. when a long-lived caller processes a sosreport that
+    was re-extracted in place. Costs one stat per call.
+    """
+    root = root.rstrip(os.sep) or os.sep
+    try:
+        mtime = os.stat(root).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _root_mtimes.get(root, mtime) != mtime:
+        prefix = os.path.join(root, "")
+        for path in [path for path in _dir_cache if path == root or path.startswith(prefix)]:
+            del _dir_cache[path]
+    _root_mtimes[root] = mtime
+
+
+def _cached_entry(path: str) -> os.DirEntry | None:
+    """
+    Return the DirEntry for path from its parent's cached listing, or None.
+    A path with a trailing separator only names a directory.
+    """
+    parent, name = os.path.split(path.rstrip(os.sep))
+    entry = _scandir_cached(parent).get(name)
+    if entry is not None and path.endswith(os.sep) and not _entry_is(entry.is_dir):
+        return None
+    return entry
+
+
+def _entry_is(test) -> bool:
+    """Call a DirEntry is_dir/is_file method, treating errors (symlink loops, EACCES) as False."""
+    try:
+        return test()
+    except OSError:
+        return False
+
+
+def _walk_files(top: str, found: set[str]) -> None:
+    """Add every file under top to found, like os.walk (symlinked subdirectories are not followed)."""
+    for entry in _scandir_cached(top).values():
+        if not _entry_is(entry.is_dir):
+            found.add(entry.path)
+        elif not entry.is_symlink():
+            _walk_files(entry.path, found)
+
+
+def _add_path(path: str, found: set[str]) -> None:
+    """Add path to found if it is a file, or every file under it if it is a directory."""
+    entry = _cached_entry(path)
+    if entry is None:
+        return
+    if _entry_is(entry.is_file):
+        found.add(path)
+    elif _entry_is(entry.is_dir):
+        _walk_files(path, found)
+
+
+@lru_cache(maxsize=None)
+def _fused_match(name_patterns: tuple[str, ...]):
+    """Return a match function for names matching any of the fnmatch patterns."""
+    if not name_patterns:
+        return lambda name: None
+    fused = "|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in name_patterns)
+    return re.compile(fused).match
 
 
 def resolve_paths(sos_root: str, file_list: list[str], glob_patterns: list[str]) -> list[str]:
     """Resolve explicit file paths and glob patterns into a deduplicated, sorted list."""
+    _refresh_dir_cache(sos_root)
     found = set()
 
     for relpath in file_list:
-        full = os.path.join(sos_root, relpath)
-        if os.path.isfile(full):
-            found.add(full)
-        elif os.path.isdir(full):
-            for root, _, files in os.walk(full):
-                for fname in files:
-                    found.add(os.path.join(root, fname))
+        _add_path(os.path.join(sos_root, relpath), found)
 
+    # Expand glob patterns against one cached listing per parent directory
+    names_by_dir = {}
     for pattern in glob_patterns:
-        for match in glob.glob(os.path.join(sos_root, pattern), recursive=False):
-            if os.path.isfile(match):
-                found.add(match)
-            elif os.path.isdir(match):
-                for root, _, files in os.walk(match):
-                    for fname in files:
-                        found.add(os.path.join(root, fname))
+        reldir, name_pattern = os.path.split(pattern)
+        if glob.has_magic(reldir) or not name_pattern:
+            # Wildcards above the last component: let glob walk the tree
+            for match in glob.glob(os.path.join(sos_root, pattern)):
+                _add_path(match, found)
+            continue
+        names_by_dir.setdefault(os.path.join(sos_root, reldir), []).append(name_pattern)
+
+    for dirname, name_patterns in names_by_dir.items():
+        entries = _scandir_cached(dirname)
+        wildcards = []
+        for name_pattern in name_patterns:
+            if glob.has_magic(name_pattern):
+                wildcards.append(name_pattern)
+            elif name_pattern in entries:
+                _add_path(os.path.join(dirname, name_pattern), found)
+        if not wildcards:
+            continue
+
+        # All of a directory's wildcard patterns are matched in one pass. Like
+        # glob, they only match hidden names if the pattern starts with "."
+        match_visible = _fused_match(tuple(wildcards))
+        match_hidden = _fused_match(tuple(p for p in wildcards if p.startswith(".")))
+        for name in entries:
+            if (match_hidden if name.startswith(".") else match_visible)(name):
+                _add_path(os.path.join(dirname, name), found)
 
     return sorted(found)
 
@@ -142,14 +414,33 @@ def make_relative(path: str, sos_root: str) -> str:
 # ---------------------------------------------------------------------------
 # Text processing
 # ---------------------------------------------------------------------------
+class _AnchorTable(dict):
+    """
+    str.translate table for heading_anchor: spaces become dashes and
+    anything but alphanumerics and dashes is dropped. Filled in as code
+    points are first seen, so str.isalnum() keeps deciding for Unicode.
+    """
+
+    def __missing__(self, codepoint: int) -> str | int | None:
+        char = chr(codepoint)
+        if char == " ":
+            value = "-"
+        elif char.isalnum() or char == "-":
+            value = codepoint
+        else:
+            value = None
+        self[codepoint] = value
+        return value
+
+
+_ANCHOR_TABLE = _AnchorTable()
+_DASH_RE = re.compile(r"-{2,}")
+
+
 def heading_anchor(name: str) -> str:
     """Convert a heading name to a markdown anchor link."""
-    anchor = name.lower()
-    anchor = "".join(c for c in anchor if c.isalnum() or c in " -")
-    anchor = anchor.replace(" ", "-")
-    while "--" in anchor:
-        anchor = anchor.replace("--", "-")
-    return anchor.strip("-")
+    anchor = name.lower().translate(_ANCHOR_TABLE)
+    return _DASH_RE.sub("-", anchor).strip("-")
 
 
 def count_words(text: str) -> int:
@@ -157,6 +448,27 @@ def count_words(text: str) -> int:
     return len(text.split())
 
 
+def tail_within_word_limit(content: str, max_words: int) -> tuple[str, int]:
+    """
+    Return the trailing whole lines of content that fit in max_words,
+    together with their word count.
+    """
+    lines = content.splitlines(keepends=True)
+    word_count = 0
+
+    # Work backwards to the first line that no longer fits, then keep the
+    # slice after it, so no reversed copy of the kept lines is built
+    start = len(lines)
+    while start:
+        line_words = len(lines[start - 1].split())
+        if word_count + line_words > max_words:
+            break
+        word_count += line_words
+        start -= 1
+
+    return "".join(lines[start:]), word_count
+
+
 def truncate_to_word_limit(content: str, max_words: int) -> tuple[str, bool]:
     """
     Truncate content to max_words, keeping the end (most recent data).
@@ -167,20 +479,6 @@ def truncate_to_word_limit(content: str, max_words: int) -> tuple[str, bool]:
     if total_words <= max_words:
         return content, False
 
-    # Truncate by lines from the end, preserving line breaks
-    lines = content.splitlines(keepends=True)
-    kept_lines = []
-    word_count = 0
-
-    # Work backwards, keeping lines until we hit the word limit
-    for line in reversed(lines):
-        line_words = len(line.split())
-        if word_count + line_words > max_words:
-            break
-        kept_lines.append(line)
-        word_count += line_words
-
-    # Reverse to restore original order
-    kept_lines.reverse()
+    kept, word_count = tail_within_word_limit(content, max_words)
     notice = WORD_TRUNCATION_NOTICE.format(limit=max_words, n=word_count)
-    return notice + "".join(kept_lines), True
+    return notice + kept, True